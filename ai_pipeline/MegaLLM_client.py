@@ -6,12 +6,30 @@ so we use the standard `openai` SDK with a custom base_url.
 
 Import in the rest of the pipeline:
     from megallm_client import call_megallm, call_megallm_with_json_schema
+
+Responses are memoized in a local SQLite store (see LLM_CACHE_* in config.py),
+so repeated chunks return instantly and the store can replay recorded
+responses for offline test runs. cache_stats() reports hits and misses.
 """
 
 from openai import OpenAI
-from config import MEGALLM_API_KEY, MEGALLM_MODEL
+from config import (
+    MEGALLM_API_KEY,
+    MEGALLM_MODEL,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_OFFLINE,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+)
+import os
 import json
 import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
 
 # ── Client setup ────────────────────────────────────────────────────────────
 client = OpenAI(
@@ -19,6 +37,102 @@ client = OpenAI(
     api_key=MEGALLM_API_KEY,
 )
 
+logger = logging.getLogger(__name__)
+
+# ── Response cache ───────────────────────────────────────────────────────────
+class _ResponseCache:
+    """
+    SQLite-backed memo of LLM responses keyed by sha256(model, params, normalized prompt).
+    Entries expire after `ttl` seconds; once `max_entries` is exceeded the least
+    recently used rows are evicted. Safe to share across threads.
+
+    The cache is an optimisation, never a dependency: if SQLite errors on a
+    lookup or store (e.g. "database is locked" with several workers on one
+    file), the call is treated as a miss / skipped store and a warning is logged.
+    """
+
+    def __init__(self, path: str, ttl: int, max_entries: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # WAL lets readers proceed while another process writes; the timeout makes a
+        # writer wait for the lock instead of failing straight away
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, params: dict) -> str:
+        normalized = re.sub(r"\s+", " ", prompt).strip()
+        payload = json.dumps({"params": params, "prompt": normalized}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, ignore_ttl: bool = False):
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or (not ignore_ttl and now - row[1] > self.ttl):
+                    self.misses += 1
+                    return None
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                self.misses += 1
+                logger.warning(f"LLM cache lookup failed, treating as miss: {e}")
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.warning(f"LLM cache store skipped: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+
+_cache = (
+    _ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+    if LLM_CACHE_ENABLED or LLM_CACHE_OFFLINE else None
+)
+
+
 # ── Helpers ──────────────────────────────────────────────────────────────────
 def _clean_json_response(text: str) -> str:
     """
@@ -103,6 +217,16 @@ def call_megallm(prompt: str, use_json_mode: bool = True) -> str:
         "max_tokens": 8192,
     }
 
+    cache_key = None
+    if _cache is not None:
+        params = {k: v for k, v in kwargs.items() if k != "messages"}
+        cache_key = _ResponseCache.make_key(full_prompt, params)
+        cached = _cache.get(cache_key, ignore_ttl=LLM_CACHE_OFFLINE)
+        if cached is not None:
+            return cached
+        if LLM_CACHE_OFFLINE:
+            raise Exception("MegaLLM API Error: no recorded response for this prompt (offline mode)")
+
     try:
         response = client.chat.completions.create(**kwargs)
         text = response.choices[0].message.content
@@ -110,14 +234,33 @@ def call_megallm(prompt: str, use_json_mode: bool = True) -> str:
         if not text or not text.strip():
             raise Exception("Empty response from MegaLLM")
 
-        if use_json_mode:
-            return _extract_json_block(text)
-
-        return text.strip()
+        result = _extract_json_block(text) if use_json_mode else text.strip()
 
     except Exception as e:
         raise Exception(f"MegaLLM API Error: {str(e)}")
 
+    if cache_key is not None and _is_cacheable(result, use_json_mode):
+        _cache.put(cache_key, result)
+    return result
+
+
+def _is_cacheable(result: str, use_json_mode: bool) -> bool:
+    """Never memoize a JSON-mode reply that doesn't parse — it would fail every re-run."""
+    if not use_json_mode:
+        return True
+    try:
+        json.loads(result)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for this process plus the number of stored responses."""
+    if _cache is None:
+        return {"hits": 0, "misses": 0, "hitRate": 0.0, "entries": 0}
+    return _cache.stats()
+
 
 def call_megallm_with_json_schema(prompt: str, json_schema: dict) -> dict:
     """
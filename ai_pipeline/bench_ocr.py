@@ -0,0 +1,120 @@
+"""
+Benchmark OCR on the bundled sample PDFs.
+
+1. Backends: every page is rendered once at OCR_FAST_ZOOM and fed to each
+   available backend; pages/s is reported per backend.
+2. Strategies: the old fixed path (whole page at Matrix(2.0), English, default
+   PSM) against the tiered ocr_page(), both on the configured backend. Time
+   per page covers rendering + OCR. Accuracy is word recall against the PDF's
+   own text layer, so it is only reported for pages that have one.
+
+Usage:
+    python bench_ocr.py [--folder pdfs] [--repeat 3]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from collections import Counter
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_SCRIPT_DIR)
+
+import fitz          # PyMuPDF
+
+from config import OCR_FAST_ZOOM
+from ocr import get_backend, ocr_page, FAST_LANG, _group_blocks, _block_text
+
+
+def _pdf_paths(folder: str) -> list:
+    return [os.path.join(folder, n) for n in sorted(os.listdir(folder)) if n.lower().endswith(".pdf")]
+
+
+def _render_pages(folder: str) -> list:
+    pixmaps = []
+    for path in _pdf_paths(folder):
+        with fitz.open(path) as doc:
+            for page in doc:
+                pixmaps.append(page.get_pixmap(matrix=fitz.Matrix(OCR_FAST_ZOOM, OCR_FAST_ZOOM), alpha=False))
+    return pixmaps
+
+
+def _fixed_ocr(page) -> str:
+    """The pre-tiered path: whole page at Matrix(2.0, 2.0), eng, PSM 3."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0), alpha=False)
+    blocks = _group_blocks(get_backend().image_to_data(pix, FAST_LANG, 3))
+    return "\n".join(_block_text(b) for b in blocks)
+
+
+def _words(text: str) -> Counter:
+    return Counter(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _recall(ocr_text: str, reference: str) -> float:
+    ref = _words(reference)
+    return sum((_words(ocr_text) & ref).values()) / max(1, sum(ref.values()))
+
+
+def bench_backends(pixmaps: list, repeat: int) -> None:
+    for name in ("pytesseract", "tesserocr"):
+        try:
+            backend = get_backend(name)
+            backend.image_to_data(pixmaps[0], FAST_LANG, 3)  # warm-up: load language data once
+        except Exception as e:
+            print(f"{name:<12} unavailable ({type(e).__name__}: {e}) — skipped")
+            continue
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for pix in pixmaps:
+                backend.image_to_data(pix, FAST_LANG, 3)
+        elapsed = time.perf_counter() - started
+        pages = len(pixmaps) * repeat
+        print(f"{name:<12} {pages / elapsed:6.2f} pages/s  ({elapsed / pages * 1000:.0f} ms/page)")
+
+
+def bench_strategies(folder: str, repeat: int) -> None:
+    strategies = {"fixed 2.0x": _fixed_ocr, "tiered": ocr_page}
+    times = {name: [] for name in strategies}
+    recalls = {name: [] for name in strategies}
+
+    for path in _pdf_paths(folder):
+        with fitz.open(path) as doc:
+            for page in doc:
+                reference = page.get_text()
+                for name, run in strategies.items():
+                    started = time.perf_counter()
+                    for _ in range(repeat):
+                        text = run(page)
+                    times[name].append((time.perf_counter() - started) / repeat)
+                    if len(reference.split()) >= 20:
+                        recalls[name].append(_recall(text, reference))
+
+    for name in strategies:
+        t, r = times[name], recalls[name]
+        accuracy = f"word recall {sum(r) / len(r):6.1%} on {len(r)} text-layer page(s)" if r else "no text-layer pages"
+        print(f"{name:<12} {sum(t) / len(t) * 1000:6.0f} ms/page over {len(t)} page(s), {accuracy}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR benchmark")
+    parser.add_argument("--folder", default=os.path.join(_SCRIPT_DIR, "pdfs"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pixmaps = _render_pages(args.folder)
+    if not pixmaps:
+        print(f"📁 No PDF pages found in {args.folder}")
+        return
+    print(f"📄 {len(pixmaps)} page(s) from {args.folder}, {args.repeat} run(s) each\n")
+
+    print("── Backends (fast pass) ──")
+    bench_backends(pixmaps, args.repeat)
+    print(f"\n── Strategies ({get_backend().name}) ──")
+    bench_strategies(args.folder, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
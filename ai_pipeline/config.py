@@ -7,5 +7,38 @@ MONGO_URI       = os.getenv("MONGODB_URI")
 MEGALLM_API_KEY = os.getenv("MEGALLM_API_KEY")
 MEGALLM_MODEL   = os.getenv("MEGALLM_MODEL", "deepseek-ai/deepseek-v3.1")
 
+# ── Mongo client tuning ──────────────────────────────────────────────────────
+# MONGO_WRITE_CONCERN: "majority" (default, durable) or "1" for faster bulk ingest
+MONGO_MAX_POOL_SIZE               = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS           = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_WRITE_CONCERN               = os.getenv("MONGO_WRITE_CONCERN", "majority")
+
+# ── OCR tiers ────────────────────────────────────────────────────────────────
+# Fast pass renders at OCR_FAST_ZOOM (1.0 = 72 DPI); regions whose mean word
+# confidence is below OCR_MIN_CONFIDENCE are re-read at OCR_FINE_ZOOM with OCR_LANGS.
+# 1.5 is ~20% faster but misses small print entirely (bench_ocr.py: 89% vs 96% recall).
+OCR_FAST_ZOOM      = float(os.getenv("OCR_FAST_ZOOM", "2.0"))
+OCR_FINE_ZOOM      = float(os.getenv("OCR_FINE_ZOOM", "3.0"))
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+OCR_LANGS          = os.getenv("OCR_LANGS", "eng")  # e.g. "hin+eng"; packs not installed are dropped
+# OCR_ENGINE: "auto" (in-process tesserocr if installed, else pytesseract) | "tesserocr" | "pytesseract"
+OCR_ENGINE         = os.getenv("OCR_ENGINE", "auto")
+
+# ── LLM response cache ───────────────────────────────────────────────────────
+# LLM_CACHE_OFFLINE=1 serves only recorded responses (misses raise) — for test runs.
+LLM_CACHE_ENABLED     = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_OFFLINE     = os.getenv("LLM_CACHE_OFFLINE", "0") == "1"
+LLM_CACHE_PATH        = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "llm_cache.sqlite3")
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# ── Local search index ───────────────────────────────────────────────────────
+SEARCH_INDEX_DIR = os.getenv(
+    "SEARCH_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "index")
+)
+
 if not MONGO_URI or not MEGALLM_API_KEY:
     raise ValueError("Missing environment variables: MONGODB_URI and MEGALLM_API_KEY are required")
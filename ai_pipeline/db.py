@@ -1,15 +1,75 @@
 import re
+import time
+import asyncio
+import atexit
 import logging
-from pymongo import MongoClient, UpdateOne
+from datetime import date, datetime, timezone
+from pymongo import MongoClient, UpdateOne, ReplaceOne
 from pymongo.errors import DuplicateKeyError
-from config import MONGO_URI
+from config import (
+    MONGO_URI,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WRITE_CONCERN,
+)
+from search_index import index_document, remove_documents
 
-client = MongoClient(MONGO_URI)
+logger = logging.getLogger(__name__)
+
+
+# ── Client lifecycle ─────────────────────────────────────────────────────────
+def _client_options() -> dict:
+    """
+    Pool / timeout / write-concern settings shared by the sync and async clients.
+    MONGO_WRITE_CONCERN is "majority" or an integer ack count ("1" for bulk ingest).
+    """
+    w = MONGO_WRITE_CONCERN
+    return {
+        "maxPoolSize":              MONGO_MAX_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS":          MONGO_SOCKET_TIMEOUT_MS,
+        "w":                        int(w) if w.isdigit() else w,
+    }
+
+
+# One client (and therefore one connection pool) per process, shared by all workers
+client = MongoClient(MONGO_URI, **_client_options())
 db = client["Data"]
 collection = db["scholarships"]
 processed_collection = db["processed_pdfs"]  # tracks which PDFs have been ingested
+archive_collection = db["scholarships_archive"]  # expired / superseded schemes, kept for dedup
+applications_collection = db["applications"]     # written by the web app (models/Application.ts)
+
+_async_client = None
 
-logger = logging.getLogger(__name__)
+
+def get_async_db():
+    """
+    Lazily create the asyncio client (PyMongo's native async API) on first use,
+    so sync-only runs never pay for it.
+    """
+    global _async_client
+    if _async_client is None:
+        from pymongo import AsyncMongoClient
+        _async_client = AsyncMongoClient(MONGO_URI, **_client_options())
+    return _async_client["Data"]
+
+
+def close_client() -> None:
+    """Close the sync client. Registered with atexit; safe to call twice."""
+    client.close()
+
+
+async def close_async_client() -> None:
+    """Close the async client. Await this before the event loop shuts down."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+atexit.register(close_client)
 
 
 # ── Title normalization ──────────────────────────────────────────────────────
@@ -32,20 +92,145 @@ def is_pdf_already_processed(filename: str) -> bool:
     return processed_collection.find_one({"filename": filename}) is not None
 
 
-def mark_pdf_as_processed(filename: str, inserted_count: int) -> None:
+def mark_pdf_as_processed(filename: str, inserted_count: int, fingerprint: dict = None) -> None:
+    """
+    fingerprint (optional): {"size", "mtime", "contentHash"} for the file, so the
+    next startup scan can skip unchanged / renamed PDFs without re-reading them.
+    """
+    processed_collection.update_one(
+        {"filename": filename},
+        {"$set": {"filename": filename, "insertedCount": inserted_count, **(fingerprint or {})}},
+        upsert=True,
+    )
+
+
+def update_pdf_fingerprint(filename: str, fingerprint: dict) -> None:
+    """
+    Refresh the stored size/mtime/hash of a PDF whose content is already ingested
+    (touched file, or a renamed copy) so later scans skip it without re-hashing.
+    """
     processed_collection.update_one(
         {"filename": filename},
-        {"$set": {"filename": filename, "insertedCount": inserted_count}},
+        {"$set": {"filename": filename, **fingerprint}, "$setOnInsert": {"insertedCount": 0}},
+        upsert=True,
+    )
+
+
+def get_processed_index() -> tuple[dict, set]:
+    """
+    Fetch every processed-PDF record in a single query.
+    Returns ({filename: {"size", "mtime", "contentHash"}}, {contentHash, ...}).
+    """
+    by_name, hashes = {}, set()
+    cursor = processed_collection.find(
+        {}, {"_id": 0, "filename": 1, "size": 1, "mtime": 1, "contentHash": 1}
+    )
+    for doc in cursor:
+        by_name[doc["filename"]] = doc
+        if doc.get("contentHash"):
+            hashes.add(doc["contentHash"])
+    return by_name, hashes
+
+
+async def is_pdf_already_processed_async(filename: str) -> bool:
+    processed = get_async_db()["processed_pdfs"]
+    return await processed.find_one({"filename": filename}) is not None
+
+
+async def mark_pdf_as_processed_async(filename: str, inserted_count: int, fingerprint: dict = None) -> None:
+    processed = get_async_db()["processed_pdfs"]
+    await processed.update_one(
+        {"filename": filename},
+        {"$set": {"filename": filename, "insertedCount": inserted_count, **(fingerprint or {})}},
         upsert=True,
     )
 
 
 # ── Core insert ──────────────────────────────────────────────────────────────
-def insert_if_not_exists(data: dict, pdf_filename: str = None) -> bool:
+def _deadline_key(value) -> str:
+    """
+    Deadline as YYYY-MM-DD, whichever way it was stored: the pipeline writes
+    strings, the web app (models/Scholarship.ts) writes BSON Dates.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str) and value:
+        return value[:10]
+    return None
+
+
+def _is_archived_reingest(archived: list, deadline, pdf_filename: str) -> bool:
+    """
+    True if an entry matching archived docs (same normTitle/normProvider) is just
+    the old scheme coming back — same source PDF, same deadline, or a deadline
+    that is missing or already past. A re-announcement with a fresh future
+    deadline (e.g. next year's circular) is let through.
+    """
+    if not archived:
+        return False
+    if pdf_filename and any(doc.get("sourcePdf") == pdf_filename for doc in archived):
+        return True
+    deadline = _deadline_key(deadline)
+    if any(_deadline_key(doc.get("deadline")) == deadline for doc in archived):
+        return True
+    return not deadline or deadline < date.today().isoformat()
+
+
+def _build_document(data: dict, raw_title: str, raw_provider: str, pdf_filename: str) -> dict:
+    """Shape a validated entry into the stored scholarship document."""
+    return {
+        # ── Searchable / display fields ──
+        "title":               raw_title,
+        "provider":            raw_provider,
+        # ── Normalized keys for dedup ──
+        "normTitle":           _normalize(raw_title),
+        "normProvider":        _normalize(raw_provider),
+        # ── Scholarship data ──
+        "amount":              data.get("amount"),
+        "amountType":          data.get("amountType"),
+        "deadline":            data.get("deadline"),
+        "minCGPA":             data.get("minCGPA"),
+        "maxIncome":           data.get("maxIncome"),
+        "courseRestriction":   data.get("courseRestriction"),
+        "categoryRestriction": data.get("categoryRestriction"),
+        "yearRestriction":     data.get("yearRestriction"),
+        "applyLink":           data.get("applyLink"),
+        "description":         data.get("description"),
+        "location":            "Pan-India",
+        "tags":                [],
+        "sourcePdf":           pdf_filename,
+    }
+
+
+def _index_inserted(doc_id, document: dict) -> None:
+    """Keep the local search index in step with Mongo; never fail the insert over it."""
+    try:
+        index_document(doc_id, document)
+    except Exception as e:
+        logger.warning(f"Search index update failed for {doc_id}: {e}")
+
+
+def _unindex(doc_ids: list) -> None:
+    """Tombstone docs removed from the hot collection; never fail the caller over it."""
+    try:
+        remove_documents(doc_ids)
+    except Exception as e:
+        logger.warning(f"Search index removal failed for {len(doc_ids)} doc(s): {e}")
+
+
+# insert_scholarship outcomes
+INSERTED = "inserted"
+MISSING_FIELDS = "missing_fields"   # no title or provider
+DUPLICATE = "duplicate"             # same normTitle/normProvider already in the hot collection
+LINKED = "linked"                   # duplicate, but its missing sourcePdf was backfilled
+ARCHIVED = "archived"               # an old edition the archival job retired
+
+
+def insert_scholarship(data: dict, pdf_filename: str = None) -> str:
     """
     Insert a scholarship if no near-duplicate exists.
     Deduplication uses normalized title + normalized provider (case/punct insensitive).
-    Returns True if inserted, False if skipped.
+    Returns INSERTED, or the reason it was skipped (MISSING_FIELDS, DUPLICATE, LINKED, ARCHIVED).
     """
     raw_title = (data.get("title") or "").strip()
     raw_provider = (data.get("provider") or "").strip()
@@ -53,7 +238,7 @@ def insert_if_not_exists(data: dict, pdf_filename: str = None) -> bool:
     if not raw_title or not raw_provider:
         logger.warning("Skipped: missing title or provider")
         print("⚠  Skipped: missing title or provider")
-        return False
+        return MISSING_FIELDS
 
     norm_title = _normalize(raw_title)
     norm_provider = _normalize(raw_provider)
@@ -72,41 +257,84 @@ def insert_if_not_exists(data: dict, pdf_filename: str = None) -> bool:
                 {"$set": {"sourcePdf": pdf_filename}}
             )
             print(f"🔗 Linked PDF to existing: '{raw_title}'")
-        else:
-            print(f"⚠  Duplicate skipped: '{raw_title}'")
-        return False
+            return LINKED
+        print(f"⚠  Duplicate skipped: '{raw_title}'")
+        return DUPLICATE
 
-    document = {
-        # ── Searchable / display fields ──
-        "title":               raw_title,
-        "provider":            raw_provider,
-        # ── Normalized keys for dedup ──
-        "normTitle":           norm_title,
-        "normProvider":        norm_provider,
-        # ── Scholarship data ──
-        "amount":              data.get("amount"),
-        "amountType":          data.get("amountType"),
-        "deadline":            data.get("deadline"),
-        "minCGPA":             data.get("minCGPA"),
-        "maxIncome":           data.get("maxIncome"),
-        "courseRestriction":   data.get("courseRestriction"),
-        "categoryRestriction": data.get("categoryRestriction"),
-        "yearRestriction":     data.get("yearRestriction"),
-        "applyLink":           data.get("applyLink"),
-        "description":         data.get("description"),
-        "location":            "Pan-India",
-        "tags":                [],
-        "sourcePdf":           pdf_filename,
-    }
+    # Don't resurrect schemes the archival job already retired
+    archived = archive_collection.find(
+        {"normTitle": norm_title, "normProvider": norm_provider}, {"deadline": 1, "sourcePdf": 1}
+    )
+    if _is_archived_reingest(list(archived), data.get("deadline"), pdf_filename):
+        print(f"🗄  Archived scheme skipped: '{raw_title}'")
+        return ARCHIVED
+
+    document = _build_document(data, raw_title, raw_provider, pdf_filename)
 
     try:
-        collection.insert_one(document)
+        result = collection.insert_one(document)
+        _index_inserted(result.inserted_id, document)
         logger.info(f"Inserted scholarship: {raw_title}")
         print(f"✅ Inserted: '{raw_title}' by {raw_provider}")
-        return True
+        return INSERTED
     except DuplicateKeyError:
         print(f"⚠  Race-condition duplicate skipped: '{raw_title}'")
-        return False
+        return DUPLICATE
+
+
+async def insert_scholarship_async(data: dict, pdf_filename: str = None) -> str:
+    """
+    asyncio twin of insert_scholarship — same dedup keys, same return value,
+    so concurrent ingest workers can share the async client's pool.
+    """
+    raw_title = (data.get("title") or "").strip()
+    raw_provider = (data.get("provider") or "").strip()
+
+    if not raw_title or not raw_provider:
+        logger.warning("Skipped: missing title or provider")
+        print("⚠  Skipped: missing title or provider")
+        return MISSING_FIELDS
+
+    keys = {"normTitle": _normalize(raw_title), "normProvider": _normalize(raw_provider)}
+    scholarships = get_async_db()["scholarships"]
+    existing = await scholarships.find_one(keys)
+
+    if existing:
+        if pdf_filename and not existing.get("sourcePdf"):
+            await scholarships.update_one(
+                {"_id": existing["_id"]},
+                {"$set": {"sourcePdf": pdf_filename}}
+            )
+            print(f"🔗 Linked PDF to existing: '{raw_title}'")
+            return LINKED
+        print(f"⚠  Duplicate skipped: '{raw_title}'")
+        return DUPLICATE
+
+    archived = get_async_db()["scholarships_archive"].find(keys, {"deadline": 1, "sourcePdf": 1})
+    if _is_archived_reingest(await archived.to_list(None), data.get("deadline"), pdf_filename):
+        print(f"🗄  Archived scheme skipped: '{raw_title}'")
+        return ARCHIVED
+
+    try:
+        document = _build_document(data, raw_title, raw_provider, pdf_filename)
+        result = await scholarships.insert_one(document)
+        # The index update takes a blocking file lock and writes to disk — keep it off the loop
+        await asyncio.to_thread(_index_inserted, result.inserted_id, document)
+        logger.info(f"Inserted scholarship: {raw_title}")
+        print(f"✅ Inserted: '{raw_title}' by {raw_provider}")
+        return INSERTED
+    except DuplicateKeyError:
+        print(f"⚠  Race-condition duplicate skipped: '{raw_title}'")
+        return DUPLICATE
+
+
+def insert_if_not_exists(data: dict, pdf_filename: str = None) -> bool:
+    """Returns True if inserted, False if skipped (see insert_scholarship for why)."""
+    return insert_scholarship(data, pdf_filename) == INSERTED
+
+
+async def insert_if_not_exists_async(data: dict, pdf_filename: str = None) -> bool:
+    return await insert_scholarship_async(data, pdf_filename) == INSERTED
 
 
 # ── One-time migration: backfill normTitle/normProvider on existing docs ─────
@@ -152,7 +380,96 @@ def deduplicate_existing() -> int:
         # Keep the first id, delete the rest
         to_delete = ids[1:]
         collection.delete_many({"_id": {"$in": to_delete}})
+        _unindex(to_delete)
         removed += len(to_delete)
         print(f"🗑  Removed {len(to_delete)} duplicate(s) of '{group['_id']['normTitle']}'")
 
     return removed
+
+
+# ── Archival: move expired schemes out of the hot collection ─────────────────
+def _collection_bytes(coll) -> int:
+    """Uncompressed data size of a collection, or None if the server won't say."""
+    try:
+        stats = next(coll.aggregate([{"$collStats": {"storageStats": {}}}]))
+        return stats["storageStats"]["size"]
+    except Exception:
+        return None
+
+
+def _full_read_ms() -> float:
+    """Time a full-catalogue read, the way the web app lists scholarships."""
+    started = time.perf_counter()
+    for _ in collection.find({}):
+        pass
+    return (time.perf_counter() - started) * 1000
+
+
+def archive_expired(batch_size: int = 500, today: str = None, extra_filter: dict = None) -> dict:
+    """
+    Move scholarships whose deadline has passed (plus anything matching
+    extra_filter, e.g. superseded schemes) into scholarships_archive, in batches.
+    Scholarships that any Application still points to stay in the hot collection,
+    so users' saved / applied schemes keep resolving in the dashboard.
+    Archived docs keep normTitle/normProvider/deadline/sourcePdf, and
+    insert_scholarship checks the archive, so re-ingesting an old PDF won't
+    bring them back. Safe to re-run: each batch is upserted into the archive
+    before deletion.
+
+    Destructive — run it deliberately (extract_and_insert.py --archive), not on every batch.
+    Returns a report: archived / kept counts, hot docs/bytes and full-read time before/after.
+    """
+    today = today or date.today().isoformat()
+    # The pipeline stores YYYY-MM-DD strings (lexical order is date order);
+    # the web app's admin import and manual form store BSON Dates.
+    query = {"$or": [
+        {"deadline": {"$type": "string", "$lt": today}},
+        {"deadline": {"$type": "date", "$lt": datetime.fromisoformat(today)}},
+    ]}
+    if extra_filter:
+        query = {"$or": [query, extra_filter]}
+
+    referenced = set(applications_collection.distinct("scholarshipId"))
+    report = {
+        "archived": 0,
+        "keptReferenced": 0,
+        "docsBefore": collection.estimated_document_count(),
+    }
+    if not collection.count_documents({**query, "_id": {"$nin": list(referenced)}}, limit=1):
+        report["keptReferenced"] = collection.count_documents({**query, "_id": {"$in": list(referenced)}})
+        report["docsAfter"] = report["docsBefore"]
+        return report
+
+    archive_collection.create_index([("normTitle", 1), ("normProvider", 1)])
+    report["bytesBefore"] = _collection_bytes(collection)
+    report["readMsBefore"] = _full_read_ms()
+
+    while True:
+        batch = list(collection.find({**query, "_id": {"$nin": list(referenced)}}).limit(batch_size))
+        if not batch:
+            break
+        # Re-check just before deleting: a user may have saved one of these meanwhile
+        ids = [doc["_id"] for doc in batch]
+        newly_referenced = set(applications_collection.distinct("scholarshipId", {"scholarshipId": {"$in": ids}}))
+        referenced |= newly_referenced
+        batch = [doc for doc in batch if doc["_id"] not in newly_referenced]
+        if not batch:
+            continue
+
+        archived_at = datetime.now(timezone.utc)
+        archive_collection.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archivedAt": archived_at}, upsert=True) for doc in batch],
+            ordered=False,
+        )
+        archived_ids = [doc["_id"] for doc in batch]
+        collection.delete_many({"_id": {"$in": archived_ids}})
+        _unindex(archived_ids)
+        report["archived"] += len(batch)
+        print(f"🗄  Archived {report['archived']} scholarship(s) so far...")
+
+    report["keptReferenced"] = collection.count_documents({**query, "_id": {"$in": list(referenced)}})
+    report["docsAfter"] = collection.estimated_document_count()
+    report["bytesAfter"] = _collection_bytes(collection)
+    report["readMsAfter"] = _full_read_ms()
+    logger.info(f"Archival report: {report}")
+    return report
@@ -9,19 +9,27 @@ import argparse
 import logging
 import json
 import re
-import io
+import fnmatch
+import time
+import hashlib
+from collections import deque
+from contextlib import nullcontext
 import fitz          # PyMuPDF
-import pytesseract
-from PIL import Image
 
-from megallm_client import call_megallm
+from megallm_client import call_megallm, cache_stats
+from ocr import ocr_page
+from profiler import profile_pdf
 from validator import validate_data
 from db import (
+    INSERTED,
     insert_if_not_exists,
-    is_pdf_already_processed,
+    insert_scholarship,
+    get_processed_index,
     mark_pdf_as_processed,
+    update_pdf_fingerprint,
     backfill_norm_fields,
     deduplicate_existing,
+    archive_expired,
 )
 
 # Use script dir for logs so it works from any working directory
@@ -41,13 +49,34 @@ def _eprint(*args, **kwargs):
     """Print to stderr so stdout stays clean for JSON output."""
     print(*args, file=sys.stderr, **kwargs)
 
+# ── --events mode: NDJSON progress on stdout ─────────────────────────────────
+def _no_event(event: str, **fields) -> None:
+    pass
+
+
+def _make_emitter(stream):
+    """
+    Return emit(event, **fields), which writes one JSON line per event to `stream`
+    with "t" = seconds since the emitter was created.
+    """
+    started = time.perf_counter()
+
+    def emit(event: str, **fields) -> None:
+        record = {"event": event, "t": round(time.perf_counter() - started, 3), **fields}
+        stream.write(json.dumps(record, default=str) + "\n")
+        stream.flush()
+
+    return emit
+
+
 # ── PDF Text Extraction ──────────────────────────────────────────────────────
-def extract_text_from_pdf(path: str) -> str:
+def extract_text_from_pdf(path: str, emit=_no_event) -> str:
     """
     Extract structured text from a PDF using PyMuPDF with per-page OCR fallback.
     Returns text with page separators preserved for the LLM.
     """
     print(f"📄 Extracting: {os.path.basename(path)}")
+    started = time.perf_counter()
     doc = fitz.open(path)
     structured_text = ""
 
@@ -72,16 +101,26 @@ def extract_text_from_pdf(path: str) -> str:
             structured_text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
         else:
             print(f"  🔍 Page {page_num + 1}: OCR fallback")
-            pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
-            ocr_text = pytesseract.image_to_string(img)
+            ocr_started = time.perf_counter()
+            try:
+                ocr_text = ocr_page(page)
+            except Exception as e:
+                # A broken page (or OCR engine error) must not abort the whole PDF
+                logger.error(f"OCR failed [{os.path.basename(path)} p{page_num + 1}]: {e}")
+                print(f"  ⚠  Page {page_num + 1}: OCR failed: {e}")
+                ocr_text = ""
+            emit("ocr_page", page=page_num + 1, chars=len(ocr_text.strip()),
+                 ms=round((time.perf_counter() - ocr_started) * 1000))
             label = "(OCR)" if ocr_text.strip() else ""
             content = ocr_text if ocr_text.strip() else "[No readable text]"
             structured_text += f"\n--- Page {page_num + 1} {label} ---\n{content}\n"
 
+    page_count = len(doc)
     doc.close()
 
     char_count = len(structured_text.strip())
+    emit("pages_extracted", pages=page_count, chars=char_count,
+         ms=round((time.perf_counter() - started) * 1000))
     if char_count < 20:
         raise ValueError(f"PDF contains insufficient readable content ({char_count} chars)")
 
@@ -201,10 +240,286 @@ def process_pdf(pdf_path: str, pdf_filename: str) -> int:
     return inserted
 
 
-# ── Main ─────────────────────────────────────────────────────────────────────
-def main():
-    pdf_folder = "pdfs"
+# ── PDF discovery ────────────────────────────────────────────────────────────
+def _content_hash(path: str) -> str:
+    """SHA-256 of the file contents, streamed in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_fingerprint(path: str, content_hash: str = None) -> dict:
+    st = os.stat(path)
+    return {
+        "size":        st.st_size,
+        "mtime":       st.st_mtime,
+        "contentHash": content_hash or _content_hash(path),
+    }
+
+
+def _matches(name: str, pattern: str) -> bool:
+    return fnmatch.fnmatch(name.lower(), pattern.lower())
+
+
+def scan_pdfs(folder: str, pattern: str = "*.pdf", recursive: bool = False):
+    """
+    Walk `folder` with os.scandir and yield (filename, path, size, mtime) for every
+    file matching `pattern`. filename is the path relative to `folder`, so top-level
+    PDFs keep the bare names already stored in processed_pdfs.
+    """
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.is_file() and _matches(entry.name, pattern):
+                    st = entry.stat()
+                    rel = os.path.relpath(entry.path, folder).replace(os.sep, "/")
+                    yield rel, entry.path, st.st_size, st.st_mtime
+
+
+def find_unprocessed(folder: str, pattern: str = "*.pdf", recursive: bool = False) -> list:
+    """
+    Compare a directory scan against the processed_pdfs index (one DB query).
+    Unchanged files (same name, size and mtime) are skipped without being read;
+    anything else is hashed, and skipped if that content was already ingested
+    under another name. Returns [(filename, path, fingerprint), ...] sorted by name.
+    """
+    by_name, known_hashes = get_processed_index()
+    pending = []
+
+    for filename, path, size, mtime in sorted(scan_pdfs(folder, pattern, recursive)):
+        record = by_name.get(filename)
+        if record is not None and (
+            "size" not in record  # legacy record: name-only idempotency
+            or (record["size"] == size and record.get("mtime") == mtime)
+        ):
+            print(f"⏭  Already processed: {filename}")
+            continue
+
+        content_hash = _content_hash(path)
+        if content_hash in known_hashes:
+            print(f"⏭  Already processed (same content): {filename}")
+            update_pdf_fingerprint(filename, {"size": size, "mtime": mtime, "contentHash": content_hash})
+            continue
+
+        known_hashes.add(content_hash)  # identical copies within this scan
+        pending.append((filename, path, {"size": size, "mtime": mtime, "contentHash": content_hash}))
+
+    return pending
+
+
+def _profiled(filename: str, profile: dict = None):
+    """profile_pdf(...) when --profile is on, otherwise a no-op context."""
+    if profile is None:
+        return nullcontext()
+    return profile_pdf(filename, profile["dir"], profile["top"], mode=profile["mode"])
+
+
+def _ingest(filename: str, path: str, fingerprint: dict, profile: dict = None) -> int:
+    print(f"{'='*60}")
+    print(f"📂 Processing: {filename}")
 
+    with _profiled(filename, profile):
+        inserted = process_pdf(path, filename)
+
+    # Mark as done regardless of insert count (0 inserts = all duplicates)
+    mark_pdf_as_processed(filename, inserted, fingerprint)
+    print(f"✅ Done: {filename}\n")
+    return inserted
+
+
+class FolderWatcher:
+    """
+    inotify watch on `folder` (and sub-folders when recursive). Create it *before*
+    the initial scan: the kernel queues events while the batch runs, so PDFs that
+    land mid-batch are picked up by run() afterwards instead of being missed.
+    Linux only.
+    """
+
+    def __init__(self, folder: str, pattern: str = "*.pdf", recursive: bool = False):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            raise RuntimeError("Watch mode requires the 'inotify_simple' package (Linux only)")
+
+        self.folder, self.pattern, self.recursive = folder, pattern, recursive
+        self.flags = flags
+        self.inotify = INotify()
+        self.watches = {}
+        self.queue = deque()
+        self._add_tree(folder, enqueue=False)
+
+    def _add_tree(self, directory: str, enqueue: bool) -> None:
+        """
+        Watch `directory` (plus its sub-folders when recursive). With enqueue=True,
+        also queue PDFs already inside — a folder moved or created in the tree
+        may hold files that landed before its watch existed.
+        """
+        mask = self.flags.CLOSE_WRITE | self.flags.MOVED_TO | self.flags.CREATE
+        for root, dirs, files in os.walk(directory):
+            self.watches[self.inotify.add_watch(root, mask)] = root
+            if enqueue:
+                self.queue.extend(os.path.join(root, f) for f in sorted(files) if _matches(f, self.pattern))
+            if not self.recursive:
+                break
+
+    def _read_events(self) -> None:
+        flags = self.flags
+        for event in self.inotify.read():
+            directory = self.watches.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & flags.ISDIR:
+                if self.recursive and event.mask & (flags.CREATE | flags.MOVED_TO):
+                    self._add_tree(path, enqueue=True)
+                continue
+            if event.mask & flags.CREATE:
+                continue  # wait for CLOSE_WRITE so we never read a half-written file
+            if _matches(event.name, self.pattern):
+                self.queue.append(path)
+
+    def run(self, profile: dict = None) -> None:
+        """Ingest queued and future PDFs until Ctrl+C."""
+        # One query up front; afterwards the set is kept current in memory
+        _, known_hashes = get_processed_index()
+        print(f"👀 Watching {self.folder} for new PDFs (Ctrl+C to stop)")
+        try:
+            while True:
+                while self.queue:
+                    path = self.queue.popleft()
+                    if not os.path.isfile(path):
+                        continue
+                    filename = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                    try:
+                        fingerprint = _file_fingerprint(path)
+                        if fingerprint["contentHash"] in known_hashes:
+                            print(f"⏭  Already processed (same content): {filename}")
+                            update_pdf_fingerprint(filename, fingerprint)
+                            continue
+                        _ingest(filename, path, fingerprint, profile)
+                        known_hashes.add(fingerprint["contentHash"])
+                    except Exception as e:
+                        # One bad or vanished file must not end watch mode
+                        logger.error(f"Watch ingest failed [{filename}]: {e}")
+                        print(f"  ❌ Failed: {filename}: {e}")
+                self._read_events()
+        except KeyboardInterrupt:
+            print("\n🛑 Watch stopped")
+        finally:
+            self.inotify.close()
+
+
+# ── Single-file mode (--file) ────────────────────────────────────────────────
+def process_single_file(pdf_path: str, emit=_no_event) -> dict:
+    """
+    Extract → LLM → validate → insert for one PDF, reporting progress via emit().
+    Returns the JSON result the Next.js API route expects.
+    """
+    pdf_filename = os.path.basename(pdf_path)
+    errors: list[str] = []
+    inserted = 0
+    skipped = 0
+
+    try:
+        text = extract_text_from_pdf(pdf_path, emit)
+        prompt = EXTRACTION_PROMPT + text
+
+        emit("llm_request", promptChars=len(prompt))
+        llm_started = time.perf_counter()
+        try:
+            response = call_megallm(prompt, use_json_mode=True)
+        except Exception as e:
+            raise RuntimeError(f"LLM call failed: {e}")
+        emit("llm_response", responseChars=len(response),
+             ms=round((time.perf_counter() - llm_started) * 1000))
+
+        try:
+            parsed = json.loads(response)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"JSON parse error: {e}")
+
+        if isinstance(parsed, dict):
+            data_list = next((v for v in parsed.values() if isinstance(v, list)), [parsed])
+        elif isinstance(parsed, list):
+            data_list = parsed
+        else:
+            raise RuntimeError(f"Unexpected JSON root type: {type(parsed)}")
+
+        emit("entries_parsed", count=len(data_list))
+        for i, entry in enumerate(data_list):
+            entry_started = time.perf_counter()
+            if not isinstance(entry, dict):
+                skipped += 1
+                errors.append(f"Non-dict entry skipped: {type(entry)}")
+                emit("entry", index=i, status="skipped", reason=errors[-1], ms=0)
+                continue
+            title = entry.get("title")
+            try:
+                validated = validate_data(entry)
+                outcome = insert_scholarship(validated, pdf_filename)
+                if outcome == INSERTED:
+                    inserted += 1
+                    status, reason = "inserted", None
+                else:
+                    skipped += 1
+                    status, reason = "skipped", outcome
+            except ValueError as ve:
+                skipped += 1
+                errors.append(str(ve))
+                status, reason = "invalid", str(ve)
+            except Exception as e:
+                skipped += 1
+                errors.append(str(e))
+                status, reason = "error", str(e)
+            emit("entry", index=i, title=title, status=status, reason=reason,
+                 ms=round((time.perf_counter() - entry_started) * 1000))
+
+        # Mark PDF as processed
+        mark_pdf_as_processed(pdf_filename, inserted, _file_fingerprint(pdf_path))
+
+        result = {
+            "success": True,
+            "insertedCount": inserted,
+            "skippedCount": skipped,
+            "errors": errors,
+        }
+    except Exception as e:
+        result = {
+            "success": False,
+            "insertedCount": 0,
+            "skippedCount": 0,
+            "errors": [str(e)],
+        }
+
+    return result
+
+
+# ── Archival (explicit: --archive) ───────────────────────────────────────────
+def run_archive() -> None:
+    print("🗄  Archiving expired scholarships...")
+    report = archive_expired()
+    if not report["archived"]:
+        print(f"🗄  Nothing to archive ({report['keptReferenced']} expired but still referenced by applications)")
+        return
+    print(
+        f"🗄  Archived {report['archived']} expired scholarship(s), "
+        f"kept {report['keptReferenced']} referenced by applications: "
+        f"{report['docsBefore']} → {report['docsAfter']} hot docs, "
+        f"full read {report['readMsBefore']:.0f} → {report['readMsAfter']:.0f} ms"
+    )
+
+
+# ── Main ─────────────────────────────────────────────────────────────────────
+def main(pdf_folder: str = "pdfs", pattern: str = "*.pdf", recursive: bool = False, watch: bool = False,
+         profile: dict = None):
+    """profile: {"dir": ..., "top": N, "mode": "full" | "sample"} to write per-PDF profiles (see profiler.py)."""
     # ── One-time migrations (safe to run on every startup) ───────────────────
     print("🔧 Running DB maintenance...")
     backfill_norm_fields()
@@ -213,115 +528,72 @@ def main():
         print(f"🗑  Cleaned {removed} duplicate documents from DB")
     print()
 
+    # Start watching before the scan so nothing landing mid-batch is missed
+    watcher = FolderWatcher(pdf_folder, pattern, recursive) if watch else None
+
     # ── Process PDFs ─────────────────────────────────────────────────────────
-    pdf_files = sorted(f for f in os.listdir(pdf_folder) if f.lower().endswith(".pdf"))
+    pending = find_unprocessed(pdf_folder, pattern, recursive)
 
-    if not pdf_files:
-        print("📁 No PDF files found in pdfs/ folder.")
-        return
+    if not pending:
+        print(f"📁 No new PDF files found in {pdf_folder}/ folder.")
+    else:
+        print(f"📁 Found {len(pending)} new PDF(s) to process\n")
 
-    print(f"📁 Found {len(pdf_files)} PDF(s) to check\n")
     total_inserted = 0
-
-    for filename in pdf_files:
-        pdf_path = os.path.join(pdf_folder, filename)
-
-        # ── Skip already-processed PDFs ──────────────────────────────────────
-        if is_pdf_already_processed(filename):
-            print(f"⏭  Already processed: {filename}")
-            continue
-
-        print(f"{'='*60}")
-        print(f"📂 Processing: {filename}")
-
-        inserted = process_pdf(pdf_path, filename)
-        total_inserted += inserted
-
-        # Mark as done regardless of insert count (0 inserts = all duplicates)
-        mark_pdf_as_processed(filename, inserted)
-        print(f"✅ Done: {filename}\n")
+    for filename, pdf_path, fingerprint in pending:
+        total_inserted += _ingest(filename, pdf_path, fingerprint, profile)
 
     print(f"{'='*60}")
     print(f"🏁 Pipeline complete. Total new scholarships inserted: {total_inserted}")
+    stats = cache_stats()
+    print(f"🧠 LLM cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['entries']} stored")
+
+    if watcher:
+        watcher.run(profile)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scholarship PDF pipeline")
     parser.add_argument("--file", type=str, help="Path to a single PDF to process (outputs JSON to stdout)")
+    parser.add_argument("--folder", type=str, default="pdfs", help="Folder to scan for PDFs (default: pdfs)")
+    parser.add_argument("--glob", type=str, default="*.pdf", help="Filename pattern to match (default: *.pdf)")
+    parser.add_argument("--recursive", action="store_true", help="Also scan sub-folders")
+    parser.add_argument("--events", action="store_true",
+                        help="With --file: stream NDJSON progress events to stdout before the final JSON result")
+    parser.add_argument("--archive", action="store_true",
+                        help="Move expired scholarships (not referenced by any application) to the archive, then exit")
+    parser.add_argument("--watch", action="store_true", help="After the initial scan, ingest new PDFs as they land (inotify)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-PDF wall-clock flamegraph stacks (plus cProfile with --profile-mode full) "
+                             "and print hot functions")
+    parser.add_argument("--profile-dir", type=str, default=os.path.join(_SCRIPT_DIR, "profiles"),
+                        help="Where --profile writes .pstats / .collapsed files (default: profiles/)")
+    parser.add_argument("--profile-top", type=int, default=15, help="Rows in the --profile summary (default: 15)")
+    parser.add_argument("--profile-mode", choices=["full", "sample"], default="sample",
+                        help="sample = wall-clock samples only, <1%% overhead, safe for production batches; "
+                             "full = adds cProfile, up to ~60%% slower on Python-heavy code, for targeted runs "
+                             "(default: sample)")
     args = parser.parse_args()
+    profile = {"dir": args.profile_dir, "top": args.profile_top, "mode": args.profile_mode} if args.profile else None
 
     if args.file:
         # ── Single-file mode: used by the Next.js API route ──────────────────
         # Redirect ALL print() calls to stderr so stdout stays clean for JSON.
         _real_stdout = sys.stdout
         sys.stdout = sys.stderr
+        emit = _make_emitter(_real_stdout) if args.events else _no_event
 
-        pdf_path = args.file
-        pdf_filename = os.path.basename(pdf_path)
-        errors: list[str] = []
-        inserted = 0
-        skipped = 0
-
-        try:
-            text = extract_text_from_pdf(pdf_path)
-            prompt = EXTRACTION_PROMPT + text
-
-            try:
-                response = call_megallm(prompt, use_json_mode=True)
-            except Exception as e:
-                raise RuntimeError(f"LLM call failed: {e}")
-
-            try:
-                parsed = json.loads(response)
-            except json.JSONDecodeError as e:
-                raise RuntimeError(f"JSON parse error: {e}")
-
-            if isinstance(parsed, dict):
-                data_list = next((v for v in parsed.values() if isinstance(v, list)), [parsed])
-            elif isinstance(parsed, list):
-                data_list = parsed
-            else:
-                raise RuntimeError(f"Unexpected JSON root type: {type(parsed)}")
-
-            for entry in data_list:
-                if not isinstance(entry, dict):
-                    skipped += 1
-                    errors.append(f"Non-dict entry skipped: {type(entry)}")
-                    continue
-                try:
-                    validated = validate_data(entry)
-                    if insert_if_not_exists(validated, pdf_filename):
-                        inserted += 1
-                    else:
-                        skipped += 1
-                except ValueError as ve:
-                    skipped += 1
-                    errors.append(str(ve))
-                except Exception as e:
-                    skipped += 1
-                    errors.append(str(e))
-
-            # Mark PDF as processed
-            mark_pdf_as_processed(pdf_filename, inserted)
+        pdf_filename = os.path.basename(args.file)
+        with _profiled(pdf_filename, profile):
+            result = process_single_file(args.file, emit)
 
-            result = {
-                "success": True,
-                "insertedCount": inserted,
-                "skippedCount": skipped,
-                "errors": errors,
-            }
-        except Exception as e:
-            result = {
-                "success": False,
-                "insertedCount": 0,
-                "skippedCount": 0,
-                "errors": [str(e)],
-            }
-
-        # Restore real stdout and write ONLY the JSON — nothing else
+        # Restore real stdout and write the JSON result — in --events mode it is
+        # the last line, after the progress events; otherwise it is the only line
         sys.stdout = _real_stdout
         sys.stdout.write(json.dumps(result) + "\n")
         sys.stdout.flush()
         sys.exit(0)
+    elif args.archive:
+        run_archive()
     else:
-        main()
+        main(args.folder, args.glob, args.recursive, args.watch, profile)
@@ -0,0 +1,290 @@
+"""
+Tiered OCR for scanned PDF pages.
+
+Tier 1: render the page at low DPI and run Tesseract once with per-word
+        confidences. If the page reads cleanly, stop there.
+Tier 2: re-render only the low-confidence blocks at high DPI and re-OCR each
+        one with the configured language packs (e.g. hin+eng) and a
+        page-segmentation mode chosen from the block's shape.
+
+Recognition goes through an OCR backend (see OCR_ENGINE in config.py):
+  - tesserocr:   in-process TessBaseAPI, kept alive per worker thread and fed
+                 raw pixmap samples — no temp files, no subprocess per page
+  - pytesseract: spawns the tesseract CLI per call; used when tesserocr is missing
+
+Setup: both engines need Tesseract language data (eng.traineddata, plus
+hin.traineddata etc. for OCR_LANGS). Install the distro packages
+(e.g. apt install tesseract-ocr tesseract-ocr-hin, which also provide the
+tesseract binary pytesseract needs) and `pip install tesserocr` for the
+in-process engine. If the .traineddata files live elsewhere, point
+TESSDATA_PREFIX at the directory that contains them.
+
+Import in the rest of the pipeline:
+    from ocr import ocr_page
+"""
+
+import time
+import atexit
+import logging
+import threading
+import fitz          # PyMuPDF
+from PIL import Image
+
+from config import OCR_FAST_ZOOM, OCR_FINE_ZOOM, OCR_MIN_CONFIDENCE, OCR_LANGS, OCR_ENGINE
+
+logger = logging.getLogger(__name__)
+
+FAST_LANG = "eng"
+
+_TSV_FIELDS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text",
+)
+_INT_FIELDS = _TSV_FIELDS[:10]
+
+
+def _parse_tsv(tsv: str) -> dict:
+    """Tesseract TSV → column dict, the same shape as pytesseract's Output.DICT."""
+    data = {field: [] for field in _TSV_FIELDS}
+    for row in tsv.splitlines():
+        cols = row.split("\t")
+        if len(cols) < 11 or cols[0] == "level":
+            continue
+        cols += [""] * (12 - len(cols))
+        for field, value in zip(_TSV_FIELDS, cols):
+            data[field].append(int(value) if field in _INT_FIELDS else value)
+        data["conf"][-1] = float(data["conf"][-1])
+    return data
+
+
+# ── OCR backends ─────────────────────────────────────────────────────────────
+class PytesseractBackend:
+    """Shells out to the tesseract binary on every call."""
+
+    name = "pytesseract"
+
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def image_to_data(self, pix, lang: str, psm: int) -> dict:
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        tsv = self._pytesseract.image_to_data(img, lang=lang, config=f"--psm {psm}")
+        return _parse_tsv(tsv)
+
+    def languages(self) -> set:
+        return set(self._pytesseract.get_languages(config=""))
+
+
+class TesserocrBackend:
+    """
+    In-process Tesseract via tesserocr. One TessBaseAPI per (thread, lang, psm)
+    is created on first use and reused, so language data is loaded once per worker.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+        self._all_apis = []
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _api(self, lang: str, psm: int):
+        apis = self._local.__dict__.setdefault("apis", {})
+        api = apis.get((lang, psm))
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+            apis[(lang, psm)] = api
+            with self._lock:
+                self._all_apis.append(api)
+        return api
+
+    def image_to_data(self, pix, lang: str, psm: int) -> dict:
+        api = self._api(lang, psm)
+        api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+        api.Recognize()
+        return _parse_tsv(api.GetTSVText(0))
+
+    def languages(self) -> set:
+        _, langs = self._tesserocr.get_languages()
+        return set(langs)
+
+    def close(self) -> None:
+        with self._lock:
+            for api in self._all_apis:
+                api.End()
+            self._all_apis.clear()
+
+
+_BACKENDS = {"tesserocr": TesserocrBackend, "pytesseract": PytesseractBackend}
+_backend = None
+
+
+def get_backend(name: str = None):
+    """
+    Return an OCR backend. name=None uses OCR_ENGINE; "auto" prefers tesserocr
+    and falls back to pytesseract when it is not installed.
+    """
+    global _backend
+    if name is None and _backend is not None:
+        return _backend
+
+    choice = name or OCR_ENGINE
+    if choice == "auto":
+        try:
+            backend = TesserocrBackend()
+            backend._api(FAST_LANG, 3)  # fail here, not mid-batch, if tessdata is unusable
+        except Exception as e:
+            logger.info(f"tesserocr unavailable ({e}) — falling back to pytesseract")
+            backend = PytesseractBackend()
+    elif choice in _BACKENDS:
+        backend = _BACKENDS[choice]()
+    else:
+        raise ValueError(f"Unknown OCR engine: {choice}")
+
+    if name is None:
+        _backend = backend
+    return backend
+
+
+_fine_langs = None
+
+
+def _langs() -> str:
+    """
+    OCR_LANGS minus any language pack the engine doesn't have (checked once),
+    so a missing hin.traineddata degrades to English instead of failing pages.
+    """
+    global _fine_langs
+    if _fine_langs is None:
+        wanted = [lang for lang in OCR_LANGS.split("+") if lang]
+        try:
+            installed = get_backend().languages()
+        except Exception as e:
+            logger.warning(f"Could not list OCR languages ({e}); using {FAST_LANG}")
+            installed = {FAST_LANG}
+        missing = [lang for lang in wanted if lang not in installed]
+        if missing:
+            logger.warning(f"OCR language pack(s) not installed, skipping: {', '.join(missing)}")
+        _fine_langs = "+".join(lang for lang in wanted if lang in installed) or FAST_LANG
+    return _fine_langs
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+def _render(page, zoom: float, clip=None):
+    """Render to an RGB pixmap (no alpha) that either backend can read directly."""
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+
+
+def _group_blocks(data: dict) -> list:
+    """
+    Turn word-level OCR data into blocks:
+    [{"lines": [[word, ...], ...], "confs": [...], "bbox": (x0, y0, x1, y1)}, ...]
+    Bounding boxes are in pixels of the image that was OCR'd.
+    """
+    blocks = {}
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if conf < 0 or not word.strip():
+            continue
+        key = data["block_num"][i]
+        x0, y0 = data["left"][i], data["top"][i]
+        x1, y1 = x0 + data["width"][i], y0 + data["height"][i]
+        block = blocks.setdefault(key, {"lines": {}, "confs": [], "bbox": [x0, y0, x1, y1]})
+        block["lines"].setdefault((data["par_num"][i], data["line_num"][i]), []).append(word)
+        block["confs"].append(conf)
+        bbox = block["bbox"]
+        bbox[0], bbox[1] = min(bbox[0], x0), min(bbox[1], y0)
+        bbox[2], bbox[3] = max(bbox[2], x1), max(bbox[3], y1)
+
+    return [
+        {"lines": [b["lines"][k] for k in sorted(b["lines"])], "confs": b["confs"], "bbox": tuple(b["bbox"])}
+        for _, b in sorted(blocks.items())
+    ]
+
+
+def _block_text(block: dict) -> str:
+    return "\n".join(" ".join(words) for words in block["lines"])
+
+
+def _mean(values: list) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _psm_for(block: dict) -> int:
+    """
+    Pick a Tesseract page-segmentation mode from the block's shape:
+    7 = single text line, 11 = sparse text (scattered table cells), 6 = uniform block.
+    """
+    n_lines = len(block["lines"])
+    if n_lines == 1:
+        return 7
+    words_per_line = len(block["confs"]) / n_lines
+    return 11 if words_per_line < 2 else 6
+
+
+def _ocr_region(page, rect, psm: int) -> tuple[str, float]:
+    """OCR one page region at high DPI. Returns (text, mean confidence)."""
+    pix = _render(page, OCR_FINE_ZOOM, clip=rect)
+    blocks = _group_blocks(get_backend().image_to_data(pix, _langs(), psm))
+    text = "\n".join(_block_text(b) for b in blocks)
+    return text, _mean([c for b in blocks for c in b["confs"]])
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+def ocr_page(page) -> str:
+    """
+    OCR a PyMuPDF page using the fast pass first, refining only weak regions.
+    Returns the recognised text ("" if nothing readable).
+    """
+    started = time.perf_counter()
+
+    pix = _render(page, OCR_FAST_ZOOM)
+    blocks = _group_blocks(get_backend().image_to_data(pix, FAST_LANG, 3))
+
+    # Nothing found at low DPI — one full-page pass at high DPI with all languages
+    if not blocks:
+        text, _ = _ocr_region(page, page.rect, psm=3)
+        logger.info(f"OCR page {page.number + 1}: full fine pass in {time.perf_counter() - started:.2f}s")
+        return text
+
+    # Each block is judged on its own confidence: a high page average can hide
+    # one weak region (e.g. a Hindi paragraph read with the English model)
+    page_conf = _mean([c for b in blocks for c in b["confs"]])
+    if all(_mean(b["confs"]) >= OCR_MIN_CONFIDENCE for b in blocks):
+        logger.info(
+            f"OCR page {page.number + 1}: fast pass ok (conf {page_conf:.0f}) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return "\n\n".join(_block_text(b) for b in blocks)
+
+    # Re-OCR only the weak blocks; keep whichever reading is more confident
+    scale = 1.0 / OCR_FAST_ZOOM
+    parts, refined = [], 0
+    for block in blocks:
+        text, conf = _block_text(block), _mean(block["confs"])
+        if conf < OCR_MIN_CONFIDENCE:
+            x0, y0, x1, y1 = block["bbox"]
+            rect = fitz.Rect(x0 * scale, y0 * scale, x1 * scale, y1 * scale) + (-4, -4, 4, 4)
+            rect &= page.rect
+            try:
+                fine_text, fine_conf = _ocr_region(page, rect, _psm_for(block))
+            except Exception as e:
+                # Engine error on one region: keep the fast-pass reading
+                logger.warning(f"OCR page {page.number + 1}: fine pass failed ({e})")
+                fine_text, fine_conf = "", 0.0
+            # Higher confidence alone isn't enough: a reading that lost most of the
+            # words (e.g. the wrong PSM for the block) is worse than the fast one
+            if fine_conf > conf and len(fine_text.split()) * 2 >= len(block["confs"]):
+                text = fine_text
+            refined += 1
+        parts.append(text)
+
+    logger.info(
+        f"OCR page {page.number + 1}: refined {refined}/{len(blocks)} blocks "
+        f"(fast conf {page_conf:.0f}) in {time.perf_counter() - started:.2f}s"
+    )
+    return "\n\n".join(parts)
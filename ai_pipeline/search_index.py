@@ -0,0 +1,374 @@
+"""
+Local search index over ingested scholarships.
+
+Two signals per document, both updated incrementally as insert_scholarship
+writes to Mongo:
+  - BM25 over an in-memory inverted index (title tokens weighted double)
+  - cosine similarity of feature-hashed embeddings, stored as a float32
+    matrix in a memory-mapped file
+
+On disk (SEARCH_INDEX_DIR):
+  docs.jsonl     append-only log of indexed fields — the source of truth; removals
+                 are logged as {"id": ..., "deleted": true} tombstones
+  vectors.f32    append-only float32 matrix, row k belongs to the k-th non-tombstone
+                 docs.jsonl line
+  postings.pkl   snapshot of the inverted index plus the docs.jsonl byte offset it
+                 covers; lines after that offset are replayed on load
+  index.lock     fcntl lock held around every append / snapshot, so several
+                 processes (concurrent --file runs, --rebuild) can share one index
+
+Usage:
+    from search_index import index_document, search
+    python search_index.py "btech sc north east"   # query from the shell
+    python search_index.py --rebuild               # re-index everything in Mongo
+"""
+
+import os
+import re
+import json
+import zlib
+import atexit
+import pickle
+import logging
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, a single writer is assumed
+    fcntl = None
+
+from config import SEARCH_INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+DIM = 256
+BM25_K1 = 1.2
+BM25_B = 0.75
+DENSE_WEIGHT = 0.3
+
+TEXT_FIELDS = (
+    "provider", "description", "courseRestriction",
+    "categoryRestriction", "yearRestriction", "location",
+)
+_STOPWORDS = frozenset("a an and are as at be by for from in is of on or the to with".split())
+
+
+# ── Text → tokens / vectors ──────────────────────────────────────────────────
+def _tokenize(text: str) -> list:
+    return [t for t in re.findall(r"[a-z0-9]+", (text or "").lower()) if t not in _STOPWORDS]
+
+
+def _doc_tokens(doc: dict) -> list:
+    title = _tokenize(doc.get("title"))
+    rest = [t for field in TEXT_FIELDS for t in _tokenize(str(doc.get(field) or ""))]
+    return title + title + rest
+
+
+def _embed(tokens: list) -> np.ndarray:
+    """
+    Feature-hashed bag of unigrams + bigrams, L2-normalised.
+    crc32 keeps buckets stable across processes (unlike the salted built-in hash).
+    """
+    vec = np.zeros(DIM, dtype=np.float32)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vec[h % DIM] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# ── Index ────────────────────────────────────────────────────────────────────
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive advisory lock across processes (no-op where fcntl is missing)."""
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SearchIndex:
+    def __init__(self, directory: str = SEARCH_INDEX_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.dir = directory
+        self._docs_path = os.path.join(directory, "docs.jsonl")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._postings_path = os.path.join(directory, "postings.pkl")
+        self._lock_path = os.path.join(directory, "index.lock")
+        self._lock = threading.Lock()
+
+        self.ids, self.meta, self.doc_len = [], [], []
+        self.rows = []              # doc_idx → row in vectors.f32
+        self.postings = {}          # term → {doc_idx: term frequency}
+        self._live = {}             # doc_id → doc_idx of its live (non-tombstoned) copy
+        self.deleted = set()        # doc_idx of tombstoned docs, masked out of results
+        self._offset = 0            # bytes of docs.jsonl folded into memory
+        self._n_rows = 0            # vector rows those bytes account for
+        self._dirty = False
+        self._vectors = None        # np.memmap, reopened lazily after appends
+        self._arrays = None         # (rows, doc_len) as numpy, rebuilt when docs are added
+
+        with self._lock, _file_lock(self._lock_path):
+            self._load_snapshot()
+            self._sync_locked()
+
+    # ── persistence ──────────────────────────────────────────────────────────
+    def _load_snapshot(self) -> None:
+        if not os.path.exists(self._postings_path):
+            return
+        with open(self._postings_path, "rb") as f:
+            snap = pickle.load(f)
+        if "deleted" not in snap:
+            return  # older format: rebuild from docs.jsonl
+        self.ids, self.meta, self.doc_len, self.rows, self.postings = (
+            snap["ids"], snap["meta"], snap["doc_len"], snap["rows"], snap["postings"]
+        )
+        self._offset, self._n_rows = snap["offset"], snap["n_rows"]
+        self.deleted = snap["deleted"]
+        self._live = {doc_id: idx for idx, doc_id in enumerate(self.ids) if idx not in self.deleted}
+
+    def _catch_up(self) -> None:
+        """
+        Fold docs.jsonl lines appended since self._offset — by this or any other
+        process — into memory. Only newline-terminated lines are consumed, so a
+        line still being written (or torn by a crash) is never half-read.
+        """
+        if not os.path.exists(self._docs_path) or os.path.getsize(self._docs_path) <= self._offset:
+            return
+        with open(self._docs_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn lines are cut under the lock, so this was a full add line
+                logger.warning(f"Search index: skipping corrupt line at row {self._n_rows}")
+                self._n_rows += 1
+                continue
+            if entry.get("deleted"):
+                self._remove_postings(entry["id"])
+                continue
+            row = self._n_rows
+            self._n_rows += 1  # every add line has a vector row, written before it
+            if entry["id"] in self._live:
+                continue
+            self._add_postings(entry["id"], entry, _doc_tokens(entry), row)
+        self._offset += end
+
+    def _sync_locked(self) -> None:
+        """
+        With the file lock held (so no writer is mid-append): drop a torn final
+        docs.jsonl line and any vector rows beyond the last complete line left by a
+        crashed writer, then catch up with everything other writers appended.
+        """
+        if os.path.exists(self._docs_path):
+            with open(self._docs_path, "r+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - 1))
+                if size and f.read(1) != b"\n":
+                    f.seek(max(0, size - 65536))
+                    tail = f.read()
+                    cut = tail.rfind(b"\n")
+                    f.truncate(size - len(tail) + cut + 1 if cut >= 0 else 0)
+                    logger.warning("Search index: truncated torn final line in docs.jsonl")
+        self._catch_up()
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) > self._n_rows * DIM * 4:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(self._n_rows * DIM * 4)
+
+    def flush(self) -> None:
+        """Write the inverted-index snapshot so the next load skips replaying docs.jsonl."""
+        with self._lock, _file_lock(self._lock_path):
+            self._sync_locked()
+            if not self._dirty:
+                return
+            tmp = f"{self._postings_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(
+                    {
+                        "ids": self.ids, "meta": self.meta, "doc_len": self.doc_len,
+                        "rows": self.rows, "postings": self.postings, "deleted": self.deleted,
+                        "offset": self._offset, "n_rows": self._n_rows,
+                    },
+                    f, protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp, self._postings_path)
+            self._dirty = False
+
+    def _vector_matrix(self):
+        if self._n_rows == 0:
+            return np.zeros((0, DIM), dtype=np.float32)
+        if self._vectors is None or self._vectors.shape[0] != self._n_rows:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._n_rows, DIM))
+        return self._vectors
+
+    # ── updates ──────────────────────────────────────────────────────────────
+    def _add_postings(self, doc_id: str, doc: dict, tokens: list, row: int) -> None:
+        idx = len(self.ids)
+        self.ids.append(doc_id)
+        self._live[doc_id] = idx
+        self.rows.append(row)
+        self.meta.append({"title": doc.get("title"), "provider": doc.get("provider")})
+        self.doc_len.append(len(tokens))
+        for term in tokens:
+            tf = self.postings.setdefault(term, {})
+            tf[idx] = tf.get(idx, 0) + 1
+        self._dirty = True
+        self._arrays = None
+
+    def _remove_postings(self, doc_id: str) -> None:
+        idx = self._live.pop(doc_id, None)
+        if idx is None:
+            return
+        self.deleted.add(idx)
+        self._dirty = True
+        self._arrays = None
+
+    def remove(self, doc_ids) -> int:
+        """Tombstone documents (archived / deleted in Mongo). Returns how many were indexed."""
+        removed = 0
+        with self._lock, _file_lock(self._lock_path):
+            self._sync_locked()
+            lines = []
+            for doc_id in map(str, doc_ids):
+                if doc_id in self._live:
+                    lines.append(json.dumps({"id": doc_id, "deleted": True}) + "\n")
+                    self._remove_postings(doc_id)
+                    removed += 1
+            if lines:
+                data = "".join(lines).encode("utf-8")
+                with open(self._docs_path, "ab") as f:
+                    f.write(data)
+                self._offset += len(data)
+        return removed
+
+    def add(self, doc_id: str, doc: dict) -> bool:
+        """Index one document. Returns False if doc_id is already indexed."""
+        doc_id = str(doc_id)
+        entry = {"id": doc_id, "title": doc.get("title")}
+        entry.update({field: doc.get(field) for field in TEXT_FIELDS})
+        tokens = _doc_tokens(entry)
+        line = (json.dumps(entry, default=str) + "\n").encode("utf-8")
+
+        with self._lock, _file_lock(self._lock_path):
+            self._sync_locked()
+            if doc_id in self._live:
+                return False
+            with open(self._vectors_path, "ab") as f:
+                f.write(_embed(tokens).tobytes())
+            with open(self._docs_path, "ab") as f:
+                f.write(line)
+            self._add_postings(doc_id, entry, tokens, self._n_rows)
+            self._n_rows += 1
+            self._offset += len(line)
+        return True
+
+    # ── queries ──────────────────────────────────────────────────────────────
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Top-k documents for a free-text query.
+        Returns [{"id", "title", "provider", "score"}, ...] best first.
+        """
+        tokens = _tokenize(query)
+        with self._lock:
+            self._catch_up()
+            return self._search_locked(tokens, k)
+
+    def _search_locked(self, tokens: list, k: int) -> list:
+        n = len(self.ids)
+        if not tokens or n == 0:
+            return []
+        if self._arrays is None:
+            self._arrays = (
+                np.asarray(self.rows, dtype=np.int64),
+                np.asarray(self.doc_len, dtype=np.float32),
+                np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted)),
+            )
+        rows, doc_len, deleted = self._arrays
+
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / doc_len.mean())
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            docs = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+            tf = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+            idf = np.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+
+        if scores.max() > 0:
+            scores /= scores.max()
+        scores += DENSE_WEIGHT * (self._vector_matrix() @ _embed(tokens))[rows]
+        scores[deleted] = 0
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": self.ids[i], **self.meta[i], "score": float(scores[i])}
+            for i in top if scores[i] > 0
+        ]
+
+
+_index = None
+
+
+def get_index() -> SearchIndex:
+    global _index
+    if _index is None:
+        _index = SearchIndex()
+        atexit.register(_index.flush)
+    return _index
+
+
+def index_document(doc_id, doc: dict) -> bool:
+    return get_index().add(doc_id, doc)
+
+
+def remove_documents(doc_ids) -> int:
+    return get_index().remove(doc_ids)
+
+
+def search(query: str, k: int = 10) -> list:
+    return get_index().search(query, k)
+
+
+def rebuild(docs) -> int:
+    """Index every document in `docs` (e.g. a Mongo cursor) not already present."""
+    index = get_index()
+    added = sum(1 for doc in docs if index.add(doc["_id"], doc))
+    index.flush()
+    return added
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Query the local scholarship search index")
+    parser.add_argument("query", nargs="?", help="Free-text query")
+    parser.add_argument("-k", type=int, default=10, help="Number of results (default: 10)")
+    parser.add_argument("--rebuild", action="store_true", help="Index all scholarships currently in Mongo")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from db import collection
+        print(f"🔎 Indexed {rebuild(collection.find())} new document(s)")
+    if args.query:
+        started = time.perf_counter()
+        results = search(args.query, args.k)
+        print(f"🔎 {len(results)} result(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for r in results:
+            print(f"  {r['score']:.3f}  {r['title']} — {r['provider']}")